@@ -4,105 +4,149 @@ Exemplo de teste de conexão SSH para demonstração
 Parte do curso SSH - MVP 6
 """
 
+import os
 import sys
 import socket
 import subprocess
 from pathlib import Path
 
+# Nomes de chaves procurados em ~/.ssh, montados uma única vez
+_KEY_TYPES = ("id_rsa", "id_ed25519", "id_ecdsa")
+_PUB_SUFFIX_KEYS = tuple(f"{k}.pub" for k in _KEY_TYPES)
+
 def test_ssh_connection(host="localhost", port=22, timeout=5):
     """
-    Testa uma conexão SSH básica
+    Testa uma conexão SSH básica; retorna (status, linhas de saída)
     """
-    print(f"🔌 Testando conexão SSH para {host}:{port}")
+    lines = [f"🔌 Testando conexão SSH para {host}:{port}"]
     
     try:
-        # Teste básico de socket
-        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        sock.settimeout(timeout)
-        result = sock.connect_ex((host, port))
-        sock.close()
-        
-        if result == 0:
-            print(f"✅ Porta {port} está aberta em {host}")
-            return True
-        else:
-            print(f"❌ Não foi possível conectar em {host}:{port}")
-            return False
-            
-    except Exception as e:
-        print(f"❌ Erro na conexão: {e}")
-        return False
+        # create_connection fecha o socket em caso de erro
+        socket.create_connection((host, port), timeout=timeout).close()
+        lines.append(f"✅ Porta {port} está aberta em {host}")
+        return True, lines
+    except socket.gaierror as e:
+        lines.append(f"❌ Erro na conexão: {e}")
+        return False, lines
+    except OSError:
+        lines.append(f"❌ Não foi possível conectar em {host}:{port}")
+        return False, lines
 
 def list_local_ssh_keys():
     """
-    Lista chaves SSH locais
+    Lista chaves SSH locais; retorna (chaves, linhas de saída)
     """
-    print("🔑 Chaves SSH encontradas:")
+    lines = ["🔑 Chaves SSH encontradas:"]
     
     ssh_dir = Path.home() / ".ssh"
-    if not ssh_dir.exists():
-        print("❌ Diretório ~/.ssh não encontrado")
-        return []
+    try:
+        with os.scandir(ssh_dir) as it:
+            entries = {entry.name for entry in it}
+    except FileNotFoundError:
+        lines.append("❌ Diretório ~/.ssh não encontrado")
+        return [], lines
+    except NotADirectoryError:
+        # ~/.ssh existe, mas não é um diretório: não há chaves a listar
+        entries = set()
     
     key_files = []
-    for key_type in ["id_rsa", "id_ed25519", "id_ecdsa"]:
-        private_key = ssh_dir / key_type
-        public_key = ssh_dir / f"{key_type}.pub"
+    for key_type, pub in zip(_KEY_TYPES, _PUB_SUFFIX_KEYS):
+        has_private = key_type in entries
+        has_public = pub in entries
         
-        if private_key.exists() and public_key.exists():
-            print(f"✅ {key_type} (privada e pública)")
+        if has_private and has_public:
+            lines.append(f"✅ {key_type} (privada e pública)")
             key_files.append(key_type)
-        elif public_key.exists():
-            print(f"🔸 {key_type}.pub (apenas pública)")
+        elif has_public:
+            lines.append(f"🔸 {key_type}.pub (apenas pública)")
     
     if not key_files:
-        print("❌ Nenhuma chave SSH encontrada")
+        lines.append("❌ Nenhuma chave SSH encontrada")
     
-    return key_files
+    return key_files, lines
+
+def _sshd_from_pidfile():
+    """
+    Verifica o PID gravado pelo sshd; retorna None se não houver PID válido
+    """
+    for pid_file in ("/run/sshd.pid", "/var/run/sshd.pid"):
+        try:
+            with open(pid_file) as f:
+                pid = int(f.read())
+        except (OSError, ValueError):
+            continue
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            # Arquivo de PID obsoleto
+            continue
+        except PermissionError:
+            # O processo existe, mas pertence a outro usuário (root)
+            pass
+        return True
+    return None
+
+def _sshd_in_proc():
+    """
+    Procura o sshd lendo /proc/<pid>/comm diretamente (sem fork/exec)
+    """
+    with os.scandir("/proc") as it:
+        for entry in it:
+            if not entry.name.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry.name}/comm") as f:
+                    if f.read() == "sshd\n":
+                        return True
+            except OSError:
+                # Processo terminou durante a varredura ou acesso negado
+                continue
+    return False
 
 def check_ssh_service():
     """
-    Verifica se o serviço SSH está rodando localmente
+    Verifica se o serviço SSH está rodando localmente; retorna (status, linhas)
     """
-    print("🔍 Verificando serviço SSH local...")
+    lines = ["🔍 Verificando serviço SSH local..."]
     
     try:
-        # Tenta verificar se o sshd está rodando
-        result = subprocess.run(
-            ["pgrep", "-f", "sshd"], 
-            capture_output=True, 
-            text=True
-        )
+        # Ordem: arquivo de PID do sshd, /proc (Linux) e, por fim, pgrep (macOS)
+        running = _sshd_from_pidfile()
+        if running is None and os.path.isdir("/proc"):
+            running = _sshd_in_proc()
+        elif running is None:
+            # Só o código de saída interessa: sem pipes nem decodificação
+            running = subprocess.call(
+                ["pgrep", "-x", "sshd"],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL
+            ) == 0
         
-        if result.returncode == 0:
-            print("✅ Serviço SSH está rodando")
-            return True
+        if running:
+            lines.append("✅ Serviço SSH está rodando")
+            return True, lines
         else:
-            print("❌ Serviço SSH não está rodando")
-            return False
+            lines.append("❌ Serviço SSH não está rodando")
+            return False, lines
             
     except Exception as e:
-        print(f"❌ Erro ao verificar serviço: {e}")
-        return False
+        lines.append(f"❌ Erro ao verificar serviço: {e}")
+        return False, lines
 
 def main():
     """
     Função principal de teste
     """
-    print("🚀 Teste do Servidor MCP SSH")
-    print("=" * 40)
-    
-    # Testes básicos
-    test_ssh_connection()
-    print()
-    
-    list_local_ssh_keys()
-    print()
+    output = ["🚀 Teste do Servidor MCP SSH", "=" * 40]
     
-    check_ssh_service()
-    print()
+    # Testes básicos; a saída é acumulada e escrita de uma só vez
+    for check in (test_ssh_connection, list_local_ssh_keys, check_ssh_service):
+        _, lines = check()
+        output.extend(lines)
+        output.append("")
     
-    print("✨ Teste concluído!")
+    output.append("✨ Teste concluído!")
+    sys.stdout.write("\n".join(output) + "\n")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -4,192 +4,444 @@ Servidor MCP SSH - Versão Simplificada para Teste
 Este é um servidor MCP funcional para demonstração do curso SSH
 """
 
+import errno
+import selectors
 import subprocess
 import socket
+import time
+from types import MappingProxyType
 import os
 from pathlib import Path
 import json
 
+_IN_PROGRESS = (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EALREADY)
+
+# Nomes de chaves procurados em ~/.ssh, montados uma única vez
+_KEY_TYPES = ("id_rsa", "id_ed25519", "id_ecdsa", "id_dsa")
+_PUB_SUFFIX_KEYS = tuple(f"{k}.pub" for k in _KEY_TYPES)
+_AUDIT_KEY_FILES = ("id_rsa", "id_ed25519", "id_ecdsa")
+_AUDIT_FILES = _AUDIT_KEY_FILES + ("config",)
+
+# Tempo máximo (s) de reuso de uma conexão do pool: conexões pré-autenticação
+# contam no MaxStartups do sshd e são derrubadas após o LoginGraceTime
+_POOL_TTL = 10.0
+
+
+def _scan_init(host, ports, first_open=False):
+    """Cria um socket não bloqueante por porta e dispara todos os connect()
+
+    Com first_open=True, para de disparar ao achar uma porta já conectada.
+    """
+    pending, open_ports = {}, []
+    try:
+        for port in ports:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            try:
+                sock.setblocking(False)
+                result = sock.connect_ex((host, port))
+            except BaseException:
+                sock.close()
+                raise
+            if result == 0:
+                open_ports.append(port)
+                sock.close()
+                if first_open:
+                    break
+            elif result in _IN_PROGRESS:
+                pending[sock] = port
+            else:
+                sock.close()
+    except BaseException:
+        # Qualquer falha (EMFILE, OverflowError, KeyboardInterrupt...) fecha
+        # os sockets já disparados antes de propagar
+        _scan_free(pending)
+        raise
+    return pending, open_ports
+
+
+def _scan_port(pending, timeout, first_open=False):
+    """Aguarda os connect() pendentes no seletor do sistema (epoll/kqueue)
+
+    Retorna as portas abertas; com first_open=True, retorna assim que a
+    primeira porta aberta responder.
+    """
+    open_ports = []
+    deadline = time.monotonic() + timeout
+    with selectors.DefaultSelector() as sel:
+        for sock, port in pending.items():
+            sel.register(sock, selectors.EVENT_WRITE, port)
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            events = sel.select(remaining)
+            if not events:
+                break
+            for key, _ in events:
+                sock = key.fileobj
+                sel.unregister(sock)
+                del pending[sock]
+                # Socket gravável: SO_ERROR distingue conexão aceita de recusada
+                if sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0:
+                    open_ports.append(key.data)
+                sock.close()
+                if first_open and open_ports:
+                    return open_ports
+    return open_ports
+
+
+def _scan_free(pending):
+    """Fecha os sockets que não responderam dentro do timeout"""
+    for sock in pending:
+        sock.close()
+    pending.clear()
+
+
+def _is_alive(sock):
+    """Drena sem bloquear os dados pendentes e verifica se o par não fechou
+
+    O banner do sshd chega logo após o connect e nunca é lido; um MSG_PEEK
+    veria sempre esse byte, mesmo com o EOF já enfileirado atrás dele.
+    """
+    timeout = sock.gettimeout()
+    try:
+        sock.setblocking(False)
+        while True:
+            # b"" significa que o servidor encerrou a conexão (EOF)
+            if not sock.recv(4096):
+                return False
+    except BlockingIOError:
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.settimeout(timeout)
+
+
+def _audit_line(file, mode, ok):
+    """Formata um item da auditoria de permissões para exibição"""
+    if file == "~/.ssh":
+        if ok is None:
+            return "❌ Erro ao verificar permissões do diretório ~/.ssh"
+        if ok:
+            return "✅ Permissões do diretório ~/.ssh estão corretas (700)"
+        return f"⚠️ Permissões do diretório ~/.ssh: {mode:03o} (recomendado: 700)"
+    if file == "config":
+        if ok is None:
+            return "❌ Erro ao verificar permissões do arquivo config"
+        if ok:
+            return "✅ Arquivo config com permissões adequadas"
+        return f"⚠️ Arquivo config com permissões {mode:03o}"
+    if ok is None:
+        return f"❌ Erro ao verificar permissões de {file}"
+    if ok:
+        return f"✅ Chave {file} com permissões corretas (600)"
+    return f"⚠️ Chave {file} com permissões {mode:03o} (recomendado: 600)"
+
+
 class SSHMCPServer:
     """Servidor MCP para ferramentas SSH"""
     
+    # Modelo de entrada do ~/.ssh/config usado por generate_ssh_config
+    _CFG_TMPL = (
+        "Host {host}\n"
+        "    HostName {hostname}\n"
+        "    User {user}\n"
+        "    Port {port}\n"
+        "{id_line}"
+        "    ServerAliveInterval 60\n"
+        "    ServerAliveCountMax 3\n"
+    )
+    
     def __init__(self):
-        """Inicializa o servidor com as ferramentas disponíveis"""
-        self.tools = {
-            "check_ssh_connection": self.check_ssh_connection,
-            "generate_ssh_config": self.generate_ssh_config, 
-            "list_ssh_keys": self.list_ssh_keys,
-            "ssh_security_audit": self.ssh_security_audit,
-            "port_scanner": self.port_scanner
-        }
-        
-    def check_ssh_connection(self, host="localhost", port=22, username=None):
-        """Verifica se uma conexão SSH está disponível"""
-        try:
-            # Teste básico de socket
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(5)
-            result = sock.connect_ex((host, port))
+        """Inicializa o estado do servidor"""
+        # Listagem de ~/.ssh reaproveitada entre chamadas enquanto o mtime
+        # do diretório não mudar (criar/remover arquivos altera o mtime)
+        self._ssh_dir_cache = {"path": None, "mtime": None, "entries": None}
+        # Conexões TCP abertas por check_ssh_connection, por (host, porta),
+        # com o instante (time.monotonic) em que foram abertas
+        self._conn_pool = {}
+        
+    def _ssh_dir_entries(self, ssh_dir, st):
+        """Retorna os nomes em ssh_dir, relendo o diretório só se ele mudou"""
+        cache = self._ssh_dir_cache
+        if cache["path"] != ssh_dir or cache["mtime"] != st.st_mtime_ns:
+            with os.scandir(ssh_dir) as it:
+                entries = frozenset(entry.name for entry in it)
+            cache.update(path=ssh_dir, mtime=st.st_mtime_ns, entries=entries)
+        return cache["entries"]
+        
+    def _ssh_file_modes(self, ssh_dir, entries, names):
+        """Retorna {nome: st_mode & 0o777} dos arquivos presentes em names
+
+        Nomes ausentes da listagem ficam fora do dicionário; se o stat falhar,
+        o valor é None. Com entries=None (listagem indisponível), todos os
+        nomes são testados diretamente.
+        """
+        modes = {}
+        for name in names:
+            if entries is not None and name not in entries:
+                continue
+            try:
+                modes[name] = os.stat(ssh_dir / name).st_mode & 0o777
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            except OSError:
+                modes[name] = None
+        return modes
+        
+    def check_ssh_connection(self, host="localhost", port=22, username=None, output="text"):
+        """Verifica se uma conexão SSH está disponível
+
+        A conexão aberta fica no pool por até _POOL_TTL segundos; nesse
+        intervalo a resposta vem do socket já aberto (sem novo connect), de
+        modo que um listener parado pode seguir aparecendo como disponível
+        enquanto a sessão pré-autenticação existente não for encerrada.
+        """
+        data = {"host": host, "port": port, "open": False, "error": None}
+        key = (host, port)
+        # Fecha as conexões expiradas de qualquer host antes de consultar o pool
+        now = time.monotonic()
+        for expired in [k for k, (_, opened) in self._conn_pool.items()
+                        if now - opened >= _POOL_TTL]:
+            self.release(*expired)
+        pooled = self._conn_pool.get(key)
+        if pooled is not None and _is_alive(pooled[0]):
+            data["open"] = True
+        else:
+            if pooled is not None:
+                self.release(host, port)
+            try:
+                # A conexão aberta fica no pool para as próximas verificações
+                sock = socket.create_connection((host, port), timeout=5)
+                self._conn_pool[key] = (sock, time.monotonic())
+                data["open"] = True
+            except socket.gaierror as e:
+                data["error"] = str(e)
+            except OSError:
+                pass
+        
+        if output == "json":
+            return json.dumps(data)
+        if data["error"] is not None:
+            return f"❌ Erro na verificação: {data['error']}"
+        if data["open"]:
+            return f"✅ Conexão SSH disponível em {host}:{port}"
+        return f"❌ Porta {port} fechada ou inacessível em {host}"
+    
+    def release(self, host, port=22):
+        """Fecha e remove do pool a conexão com host:port, se existir"""
+        pooled = self._conn_pool.pop((host, port), None)
+        if pooled is not None:
+            pooled[0].close()
+    
+    def close(self):
+        """Fecha todas as conexões do pool"""
+        for sock, _ in self._conn_pool.values():
             sock.close()
-            
-            if result == 0:
-                return f"✅ Conexão SSH disponível em {host}:{port}"
-            else:
-                return f"❌ Porta {port} fechada ou inacessível em {host}"
-                
-        except Exception as e:
-            return f"❌ Erro na verificação: {str(e)}"
+        self._conn_pool.clear()
     
-    def list_ssh_keys(self):
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+    
+    def list_ssh_keys(self, output="text"):
         """Lista as chaves SSH disponíveis no sistema"""
         ssh_dir = Path.home() / ".ssh"
         
-        if not ssh_dir.exists():
-            return "❌ Diretório ~/.ssh não encontrado"
+        # Uma leitura do diretório substitui um stat por arquivo de chave
+        try:
+            entries = self._ssh_dir_entries(ssh_dir, os.stat(ssh_dir))
+        except FileNotFoundError:
+            entries = None
+        except NotADirectoryError:
+            # ~/.ssh existe, mas não é um diretório: não há chaves a listar
+            entries = frozenset()
             
-        keys_found = []
-        key_types = ["id_rsa", "id_ed25519", "id_ecdsa", "id_dsa"]
+        keys = []
+        if entries is not None:
+            for key_type, pub in zip(_KEY_TYPES, _PUB_SUFFIX_KEYS):
+                if pub in entries:
+                    keys.append({"name": key_type, "private": key_type in entries})
         
-        for key_type in key_types:
-            private_key = ssh_dir / key_type
-            public_key = ssh_dir / f"{key_type}.pub"
-            
-            if private_key.exists() and public_key.exists():
-                keys_found.append(f"✅ {key_type} (completa)")
-            elif public_key.exists():
-                keys_found.append(f"🔸 {key_type}.pub (apenas pública)")
-                
-        if keys_found:
-            return f"🔑 Chaves SSH encontradas:\\n" + "\\n".join(keys_found)
-        else:
+        if output == "json":
+            return json.dumps({"ssh_dir_exists": entries is not None, "keys": keys})
+        if entries is None:
+            return "❌ Diretório ~/.ssh não encontrado"
+        if not keys:
             return "❌ Nenhuma chave SSH encontrada em ~/.ssh/"
+        
+        keys_found = []
+        for key in keys:
+            if key["private"]:
+                keys_found.append(f"✅ {key['name']} (completa)")
+            else:
+                keys_found.append(f"🔸 {key['name']}.pub (apenas pública)")
+        return f"🔑 Chaves SSH encontradas:\\n" + "\\n".join(keys_found)
     
-    def generate_ssh_config(self, host, hostname, user, port=22, key_file=None):
+    def generate_ssh_config(self, host, hostname, user, port=22, key_file=None, output="text"):
         """Gera uma configuração SSH para o arquivo ~/.ssh/config"""
-        config_entry = f"""
-Host {host}
-    HostName {hostname}
-    User {user}
-    Port {port}"""
-        
-        if key_file:
-            config_entry += f"\\n    IdentityFile ~/.ssh/{key_file}"
-            
-        config_entry += "\\n    ServerAliveInterval 60\\n    ServerAliveCountMax 3"
+        id_line = f"    IdentityFile ~/.ssh/{key_file}\n" if key_file else ""
+        config = self._CFG_TMPL.format(
+            host=host, hostname=hostname, user=user, port=port, id_line=id_line
+        )
         
-        return f"📝 Configuração SSH gerada:\\n{config_entry}"
+        if output == "json":
+            return json.dumps({
+                "host": host, "hostname": hostname, "user": user, "port": port,
+                "identity_file": key_file, "config": config,
+            })
+        return f"📝 Configuração SSH gerada:\n{config}"
     
-    def ssh_security_audit(self):
+    def ssh_security_audit(self, output="text"):
         """Realiza uma auditoria básica de segurança SSH"""
-        audit_results = []
         ssh_dir = Path.home() / ".ssh"
+        checks = []
         
-        # Verificar se existe diretório .ssh
-        if not ssh_dir.exists():
-            audit_results.append("❌ Diretório ~/.ssh não existe")
-            return "\\n".join(audit_results)
-        
-        # Verificar permissões do diretório .ssh
+        # Um único stat por caminho fornece existência e permissões
+        entries = None
         try:
-            stat = ssh_dir.stat()
-            perms = oct(stat.st_mode)[-3:]
-            if perms == "700":
-                audit_results.append("✅ Permissões do diretório ~/.ssh estão corretas (700)")
-            else:
-                audit_results.append(f"⚠️ Permissões do diretório ~/.ssh: {perms} (recomendado: 700)")
-        except:
-            audit_results.append("❌ Erro ao verificar permissões do diretório ~/.ssh")
-        
-        # Verificar chaves privadas
-        for key_file in ["id_rsa", "id_ed25519", "id_ecdsa"]:
-            key_path = ssh_dir / key_file
-            if key_path.exists():
-                try:
-                    stat = key_path.stat()
-                    perms = oct(stat.st_mode)[-3:]
-                    if perms == "600":
-                        audit_results.append(f"✅ Chave {key_file} com permissões corretas (600)")
-                    else:
-                        audit_results.append(f"⚠️ Chave {key_file} com permissões {perms} (recomendado: 600)")
-                except:
-                    audit_results.append(f"❌ Erro ao verificar permissões de {key_file}")
-        
-        # Verificar arquivo config
-        config_file = ssh_dir / "config"
-        if config_file.exists():
+            st = os.stat(ssh_dir)
+        except FileNotFoundError:
+            if output == "json":
+                return json.dumps({"ssh_dir_exists": False, "checks": []})
+            return "❌ Diretório ~/.ssh não existe"
+        except OSError:
+            checks.append({"file": "~/.ssh", "mode": None, "ok": None})
+        else:
             try:
-                stat = config_file.stat()
-                perms = oct(stat.st_mode)[-3:]
-                if perms in ["600", "644"]:
-                    audit_results.append("✅ Arquivo config com permissões adequadas")
-                else:
-                    audit_results.append(f"⚠️ Arquivo config com permissões {perms}")
-            except:
-                audit_results.append("❌ Erro ao verificar permissões do arquivo config")
+                entries = self._ssh_dir_entries(ssh_dir, st)
+            except OSError:
+                pass
+            perms = st.st_mode & 0o777
+            checks.append({"file": "~/.ssh", "mode": perms, "ok": perms == 0o700})
+        
+        # Permissões de todos os arquivos auditados, coletadas de uma vez
+        modes = self._ssh_file_modes(ssh_dir, entries, _AUDIT_FILES)
+        
+        for key_file in _AUDIT_KEY_FILES:
+            if key_file in modes:
+                perms = modes[key_file]
+                ok = None if perms is None else perms == 0o600
+                checks.append({"file": key_file, "mode": perms, "ok": ok})
         
+        if "config" in modes:
+            perms = modes["config"]
+            ok = None if perms is None else perms in (0o600, 0o644)
+            checks.append({"file": "config", "mode": perms, "ok": ok})
+        
+        if output == "json":
+            for check in checks:
+                if check["mode"] is not None:
+                    check["mode"] = f"{check['mode']:03o}"
+            return json.dumps({"ssh_dir_exists": True, "checks": checks})
+        
+        audit_results = [_audit_line(**check) for check in checks]
         return "🔒 Auditoria de Segurança SSH:\\n" + "\\n".join(audit_results)
     
-    def port_scanner(self, host="localhost", start_port=20, end_port=80):
-        """Escaneia portas abertas (versão educativa limitada)"""
-        if end_port - start_port > 50:
-            return "❌ Range de portas muito amplo. Máximo 50 portas por escaneamento."
-            
-        open_ports = []
-        
-        for port in range(start_port, end_port + 1):
+    def port_scanner(self, host="localhost", start_port=20, end_port=80, first_open=False,
+                     output="text"):
+        """Escaneia portas abertas (versão educativa limitada)
+
+        Com first_open=True, encerra o escaneamento na primeira porta aberta.
+        """
+        data = {"host": host, "start_port": start_port, "end_port": end_port,
+                "open_ports": [], "error": None}
+        if not 0 <= start_port <= end_port <= 65535:
+            data["error"] = "Range de portas inválido. Use 0 <= start_port <= end_port <= 65535."
+        elif end_port - start_port > 50:
+            data["error"] = "Range de portas muito amplo. Máximo 50 portas por escaneamento."
+        else:
             try:
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(0.5)
-                result = sock.connect_ex((host, port))
-                if result == 0:
-                    open_ports.append(port)
-                sock.close()
-            except:
-                continue
+                data["open_ports"] = self._scan(host, start_port, end_port, first_open)
+            except OSError as e:
+                data["error"] = f"Erro no escaneamento: {str(e)}"
         
-        if open_ports:
-            return f"🔍 Portas abertas em {host}: {', '.join(map(str, open_ports))}"
+        if output == "json":
+            return json.dumps(data)
+        if data["error"] is not None:
+            return f"❌ {data['error']}"
+        if data["open_ports"]:
+            return f"🔍 Portas abertas em {host}: {', '.join(map(str, data['open_ports']))}"
         else:
             return f"🔍 Nenhuma porta aberta encontrada em {host} (range {start_port}-{end_port})"
+    
+    def _scan(self, host, start_port, end_port, first_open):
+        """Executa o escaneamento e retorna a lista ordenada de portas abertas"""
+        # Todas as portas são testadas em paralelo: o tempo total fica
+        # próximo de um único timeout, independente do tamanho do range.
+        # O nome é resolvido uma única vez em vez de um getaddrinfo por porta
+        infos = socket.getaddrinfo(host, None, socket.AF_INET, socket.SOCK_STREAM)
+        ip = infos[0][4][0]
+        pending, open_ports = _scan_init(ip, range(start_port, end_port + 1), first_open)
+        # Em loopback, RST/SYN-ACK chegam em microssegundos; o timeout
+        # longo só faz diferença para portas filtradas em hosts remotos
+        timeout = 0.05 if ip.startswith("127.") else 0.5
+        try:
+            if not (first_open and open_ports):
+                open_ports += _scan_port(pending, timeout, first_open)
+        finally:
+            _scan_free(pending)
+        open_ports.sort()
+        return open_ports
+
+    def call_tool(self, name, **kwargs):
+        """Executa a ferramenta pelo nome"""
+        try:
+            tool = SSHMCPServer.TOOLS[name]
+        except KeyError:
+            raise ValueError(f"Ferramenta desconhecida: {name}") from None
+        return tool(self, **kwargs)
+
+    # Ferramentas disponíveis, montadas uma única vez na definição da classe
+    TOOLS = MappingProxyType({
+        "check_ssh_connection": check_ssh_connection,
+        "generate_ssh_config": generate_ssh_config,
+        "list_ssh_keys": list_ssh_keys,
+        "ssh_security_audit": ssh_security_audit,
+        "port_scanner": port_scanner,
+    })
 
 def main():
     """Função principal para testes"""
     print("🚀 SSH MCP Server - Modo de Teste")
     print("=" * 50)
     
-    server = SSHMCPServer()
-    
-    # Demonstrar todas as ferramentas
-    print("🛠️ Ferramentas disponíveis:")
-    for tool_name in server.tools.keys():
-        print(f"  - {tool_name}")
-    
-    print("\\n🧪 Executando testes das ferramentas...")
-    
-    # Teste 1: Verificar conexão SSH
-    print("\\n1. Verificando conexão SSH:")
-    result = server.check_ssh_connection()
-    print(f"   {result}")
-    
-    # Teste 2: Listar chaves SSH
-    print("\\n2. Listando chaves SSH:")
-    result = server.list_ssh_keys()
-    print(f"   {result}")
-    
-    # Teste 3: Gerar configuração SSH
-    print("\\n3. Gerando configuração SSH de exemplo:")
-    result = server.generate_ssh_config("exemplo", "servidor.com", "usuario")
-    print(f"   {result}")
-    
-    # Teste 4: Auditoria de segurança
-    print("\\n4. Auditoria de segurança:")
-    result = server.ssh_security_audit()
-    print(f"   {result}")
-    
-    # Teste 5: Port scan limitado
-    print("\\n5. Escaneamento de portas:")
-    result = server.port_scanner("localhost", 20, 25)
-    print(f"   {result}")
+    # O bloco with fecha as conexões deixadas no pool por check_ssh_connection
+    with SSHMCPServer() as server:
+        # Demonstrar todas as ferramentas
+        print("🛠️ Ferramentas disponíveis:")
+        for tool_name in SSHMCPServer.TOOLS:
+            print(f"  - {tool_name}")
+        
+        print("\\n🧪 Executando testes das ferramentas...")
+        
+        # Teste 1: Verificar conexão SSH
+        print("\\n1. Verificando conexão SSH:")
+        result = server.check_ssh_connection()
+        print(f"   {result}")
+        
+        # Teste 2: Listar chaves SSH
+        print("\\n2. Listando chaves SSH:")
+        result = server.list_ssh_keys()
+        print(f"   {result}")
+        
+        # Teste 3: Gerar configuração SSH
+        print("\\n3. Gerando configuração SSH de exemplo:")
+        result = server.generate_ssh_config("exemplo", "servidor.com", "usuario")
+        print(f"   {result}")
+        
+        # Teste 4: Auditoria de segurança
+        print("\\n4. Auditoria de segurança:")
+        result = server.ssh_security_audit()
+        print(f"   {result}")
+        
+        # Teste 5: Port scan limitado
+        print("\\n5. Escaneamento de portas:")
+        result = server.port_scanner("localhost", 20, 25)
+        print(f"   {result}")
     
     print("\\n✨ Todos os testes concluídos!")
 
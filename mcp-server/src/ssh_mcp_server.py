@@ -9,152 +9,168 @@ Este servidor fornece ferramentas para trabalhar com SSH, incluindo:
 """
 
 import asyncio
-import json
+import functools
 import logging
-import subprocess
 import os
-from pathlib import Path
-from typing import Any, Dict, List, Optional
+import re
+from dataclasses import dataclass, fields
+from typing import Any, Dict, List, Tuple
 from mcp.server import Server
 from mcp.server.models import InitializationOptions
 import mcp.server.stdio
 import mcp.types as types
 
-# Configurar logging
-logging.basicConfig(level=logging.INFO)
+# Logger do módulo; a configuração de handlers fica a cargo de quem executa
 logger = logging.getLogger("ssh-mcp-server")
 
+# Diretório SSH do usuário, expandido uma única vez na importação
+_HOME_SSH = os.path.expanduser("~/.ssh")
+
+# Limite do trecho do ssh_config copiado para a resposta (caracteres)
+_CONFIG_EMBED_LIMIT = 8192
+
+# Linhas "Host ..." do ssh_config, extraídas em uma única varredura
+_HOST_RE = re.compile(r'^[ \t]*(Host [ \t]*\S.*?)[ \t]*$', re.M)
+
 # Criar instância do servidor MCP
 server = Server("ssh-tools")
 
-@server.list_tools()
-async def handle_list_tools() -> List[types.Tool]:
-    """
-    Lista todas as ferramentas disponíveis no servidor MCP.
-    """
-    return [
-        types.Tool(
-            name="generate_ssh_key",
-            description="Gera um novo par de chaves SSH com algoritmo especificado",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "key_type": {
-                        "type": "string",
-                        "description": "Tipo de chave SSH (ed25519, rsa, ecdsa)",
-                        "enum": ["ed25519", "rsa", "ecdsa"],
-                        "default": "ed25519"
-                    },
-                    "key_size": {
-                        "type": "integer", 
-                        "description": "Tamanho da chave em bits (apenas para RSA)",
-                        "default": 4096
-                    },
-                    "comment": {
-                        "type": "string",
-                        "description": "Comentário para a chave SSH",
-                        "default": ""
-                    },
-                    "filename": {
-                        "type": "string",
-                        "description": "Nome do arquivo para salvar a chave",
-                        "default": "id_ed25519"
-                    }
+# Esquema das ferramentas é estático: montado uma única vez na importação
+_TOOLS: List[types.Tool] = [
+    types.Tool(
+        name="generate_ssh_key",
+        description="Gera um novo par de chaves SSH com algoritmo especificado (Ed25519 recomendado)",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "key_type": {
+                    "type": "string",
+                    "description": "Tipo de chave SSH (ed25519, rsa, ecdsa)",
+                    "enum": ["ed25519", "rsa", "ecdsa"],
+                    "default": "ed25519"
                 },
-                "required": []
-            }
-        ),
-        types.Tool(
-            name="check_ssh_config",
-            description="Verifica e valida configurações SSH do cliente",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "config_file": {
-                        "type": "string",
-                        "description": "Caminho para o arquivo de configuração SSH",
-                        "default": "~/.ssh/config"
-                    }
+                "key_size": {
+                    "type": "integer", 
+                    "description": (
+                        "Tamanho da chave em bits (apenas para RSA). Chaves maiores "
+                        "deixam cada handshake mais lento: RSA 4096 assina ~6-7x mais "
+                        "devagar que RSA 2048; prefira Ed25519 quando possível"
+                    ),
+                    "default": 3072
                 },
-                "required": []
-            }
-        ),
-        types.Tool(
-            name="analyze_ssh_connection",
-            description="Analisa uma tentativa de conexão SSH e retorna informações detalhadas",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "host": {
-                        "type": "string",
-                        "description": "Hostname ou IP do servidor SSH"
-                    },
-                    "port": {
-                        "type": "integer",
-                        "description": "Porta do servidor SSH",
-                        "default": 22
-                    },
-                    "user": {
-                        "type": "string", 
-                        "description": "Nome do usuário para conexão"
-                    }
+                "comment": {
+                    "type": "string",
+                    "description": "Comentário para a chave SSH",
+                    "default": ""
                 },
-                "required": ["host", "user"]
-            }
-        ),
-        types.Tool(
-            name="ssh_security_audit",
-            description="Realiza uma auditoria de segurança nas configurações SSH",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "target_type": {
-                        "type": "string",
-                        "description": "Tipo de auditoria (client, server, keys)",
-                        "enum": ["client", "server", "keys"],
-                        "default": "client"
-                    }
+                "filename": {
+                    "type": "string",
+                    "description": "Nome do arquivo para salvar a chave",
+                    "default": "id_ed25519"
+                }
+            },
+            "required": []
+        }
+    ),
+    types.Tool(
+        name="check_ssh_config",
+        description="Verifica e valida configurações SSH do cliente",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "config_file": {
+                    "type": "string",
+                    "description": "Caminho para o arquivo de configuração SSH",
+                    "default": "~/.ssh/config"
+                }
+            },
+            "required": []
+        }
+    ),
+    types.Tool(
+        name="analyze_ssh_connection",
+        description="Analisa uma tentativa de conexão SSH e retorna informações detalhadas",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "host": {
+                    "type": "string",
+                    "description": "Hostname ou IP do servidor SSH"
                 },
-                "required": []
-            }
-        ),
-        types.Tool(
-            name="create_ssh_tunnel",
-            description="Cria um comando para túnel SSH com port forwarding",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "tunnel_type": {
-                        "type": "string",
-                        "description": "Tipo de túnel SSH",
-                        "enum": ["local", "remote", "dynamic"],
-                        "default": "local"
-                    },
-                    "local_port": {
-                        "type": "integer",
-                        "description": "Porta local para o túnel"
-                    },
-                    "remote_host": {
-                        "type": "string",
-                        "description": "Host remoto"
-                    },
-                    "remote_port": {
-                        "type": "integer", 
-                        "description": "Porta remota"
-                    },
-                    "ssh_server": {
-                        "type": "string",
-                        "description": "Servidor SSH intermediário"
-                    },
-                    "user": {
-                        "type": "string",
-                        "description": "Usuário SSH"
-                    }
+                "port": {
+                    "type": "integer",
+                    "description": "Porta do servidor SSH",
+                    "default": 22
                 },
-                "required": ["local_port", "remote_host", "remote_port", "ssh_server", "user"]
-            }
-        )
-    ]
+                "user": {
+                    "type": "string", 
+                    "description": "Nome do usuário para conexão"
+                }
+            },
+            "required": ["host", "user"]
+        }
+    ),
+    types.Tool(
+        name="ssh_security_audit",
+        description="Realiza uma auditoria de segurança nas configurações SSH",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "target_type": {
+                    "type": "string",
+                    "description": "Tipo de auditoria (client, server, keys)",
+                    "enum": ["client", "server", "keys"],
+                    "default": "client"
+                }
+            },
+            "required": []
+        }
+    ),
+    types.Tool(
+        name="create_ssh_tunnel",
+        description="Cria um comando para túnel SSH com port forwarding",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "tunnel_type": {
+                    "type": "string",
+                    "description": "Tipo de túnel SSH",
+                    "enum": ["local", "remote", "dynamic"],
+                    "default": "local"
+                },
+                "local_port": {
+                    "type": "integer",
+                    "description": "Porta local para o túnel"
+                },
+                "remote_host": {
+                    "type": "string",
+                    "description": "Host remoto"
+                },
+                "remote_port": {
+                    "type": "integer", 
+                    "description": "Porta remota"
+                },
+                "ssh_server": {
+                    "type": "string",
+                    "description": "Servidor SSH intermediário"
+                },
+                "user": {
+                    "type": "string",
+                    "description": "Usuário SSH"
+                }
+            },
+            "required": ["local_port", "remote_host", "remote_port", "ssh_server", "user"]
+        }
+    )
+]
+
+@server.list_tools()
+async def handle_list_tools() -> List[types.Tool]:
+    """
+    Lista todas as ferramentas disponíveis no servidor MCP.
+    """
+    # Cópia rasa para que o chamador não altere a lista compartilhada
+    return list(_TOOLS)
 
 @server.call_tool()
 async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[types.TextContent]:
@@ -162,18 +178,10 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[types.T
     Processa chamadas para as ferramentas disponíveis.
     """
     try:
-        if name == "generate_ssh_key":
-            return await generate_ssh_key(arguments)
-        elif name == "check_ssh_config":
-            return await check_ssh_config(arguments)
-        elif name == "analyze_ssh_connection":
-            return await analyze_ssh_connection(arguments)
-        elif name == "ssh_security_audit":
-            return await ssh_security_audit(arguments)
-        elif name == "create_ssh_tunnel":
-            return await create_ssh_tunnel(arguments)
-        else:
+        handler = _HANDLERS.get(name)
+        if handler is None:
             raise ValueError(f"Ferramenta desconhecida: {name}")
+        return await handler(arguments)
     except Exception as e:
         logger.error(f"Erro ao executar ferramenta {name}: {str(e)}")
         return [types.TextContent(
@@ -181,12 +189,40 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[types.T
             text=f"Erro ao executar {name}: {str(e)}"
         )]
 
+async def _run(cmd: List[str]) -> Tuple[int, bytes, bytes]:
+    """
+    Executa um comando externo sem bloquear o loop de eventos.
+    
+    Retorna (código de saída, stdout, stderr).
+    """
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    out, err = await proc.communicate()
+    return proc.returncode, out, err
+
+# Limites de concorrência para conexões SSH de saída (MaxStartups do sshd)
+# entram junto com a primeira ferramenta que abrir essas conexões
+
+# Pool de conexões asyncssh e multiplexação do OpenSSH (ControlMaster)
+# ficam para quando algum handler abrir sessões SSH reais: hoje nenhuma
+# ferramenta conecta a um servidor remoto, então não haveria o que reaproveitar
+
+_RSA_COST_WARNING = """
+🐢 **Desempenho:** assinaturas RSA 4096 são ~6-7x mais lentas que RSA 2048
+e ordens de grandeza mais lentas que Ed25519/ECDSA de 256 bits. Como o
+servidor pede uma assinatura a cada autenticação, todo handshake SSH com
+esta chave fica mais lento. Prefira `-t ed25519` ou RSA 3072.
+"""
+
 async def generate_ssh_key(args: Dict[str, Any]) -> List[types.TextContent]:
     """
     Gera um novo par de chaves SSH.
     """
     key_type = args.get("key_type", "ed25519")
-    key_size = args.get("key_size", 4096)
+    key_size = args.get("key_size", 3072)
     comment = args.get("comment", "")
     filename = args.get("filename", f"id_{key_type}")
     
@@ -199,7 +235,8 @@ async def generate_ssh_key(args: Dict[str, Any]) -> List[types.TextContent]:
     if comment:
         cmd.extend(["-C", comment])
     
-    # Para demonstração, vamos apenas mostrar o comando que seria executado
+    # Para demonstração, vamos apenas mostrar o comando que seria executado;
+    # ao executá-lo de fato, use `await _run(cmd)` em vez de subprocess.run
     cmd_str = " ".join(cmd)
     
     result = f"""
@@ -215,7 +252,7 @@ async def generate_ssh_key(args: Dict[str, Any]) -> List[types.TextContent]:
 - Arquivo: ~/.ssh/{filename}
 - Chave pública: ~/.ssh/{filename}.pub
 {"- Comentário: " + comment if comment else ""}
-
+{_RSA_COST_WARNING if key_type == "rsa" and key_size >= 4096 else ""}
 ⚠️  **Importante:**
 - A chave privada deve ser mantida segura e nunca compartilhada
 - A chave pública pode ser copiada para servidores remotos
@@ -229,55 +266,118 @@ async def generate_ssh_key(args: Dict[str, Any]) -> List[types.TextContent]:
     
     return [types.TextContent(type="text", text=result)]
 
-async def check_ssh_config(args: Dict[str, Any]) -> List[types.TextContent]:
+def _scan_ssh_dir(ssh_dir: str):
     """
-    Verifica configurações SSH do cliente.
+    Lista o diretório SSH.
+    
+    Retorna (total de entradas, ((arquivo, tamanho), ...)) ou None se o
+    diretório não existir. O resultado é hashable para servir de chave
+    de cache.
     """
-    config_file = args.get("config_file", "~/.ssh/config")
-    expanded_path = os.path.expanduser(config_file)
+    try:
+        with os.scandir(ssh_dir) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    except FileNotFoundError:
+        return None
+    
+    # DirEntry reaproveita o tipo vindo do readdir e guarda o stat em cache
+    files = tuple((e.name, e.stat().st_size) for e in entries if e.is_file())
+    return len(entries), files
+
+@functools.lru_cache(maxsize=64)
+def _render_config_report(config_file: str, expanded_path: str, stamp, dir_snapshot) -> str:
+    """
+    Monta o relatório de check_ssh_config.
     
-    result = f"🔍 **Verificação de Configuração SSH**\n\n"
-    result += f"📁 **Arquivo:** {config_file}\n\n"
+    stamp (mtime, ctime, tamanho do arquivo) e dir_snapshot (listagem de
+    ~/.ssh) só entram como chave do cache: qualquer alteração no arquivo
+    ou no diretório gera uma chave nova e força a releitura.
+    """
+    parts: List[str] = [f"🔍 **Verificação de Configuração SSH**\n\n"]
+    parts.append(f"📁 **Arquivo:** {config_file}\n\n")
     
-    if os.path.exists(expanded_path):
-        try:
-            with open(expanded_path, 'r') as f:
-                content = f.read()
-            
-            result += "✅ **Status:** Arquivo encontrado\n\n"
-            result += f"📝 **Conteúdo do arquivo:**\n```\n{content}\n```\n\n"
-            
-            # Análise básica
-            lines = content.split('\n')
-            hosts = [line.strip() for line in lines if line.strip().startswith('Host ')]
-            
-            result += f"🖥️  **Hosts configurados:** {len(hosts)}\n"
-            for host in hosts:
-                result += f"   - {host}\n"
-                
-        except Exception as e:
-            result += f"❌ **Erro ao ler arquivo:** {str(e)}\n"
+    try:
+        with open(expanded_path, 'r') as f:
+            content = f.read()
+    except FileNotFoundError:
+        parts.append("⚠️  **Status:** Arquivo não encontrado\n\n")
+        parts.append("💡 **Sugestão:** Crie o arquivo de configuração SSH:\n")
+        parts.append(f"```bash\ntouch {config_file}\nchmod 600 {config_file}\n```\n")
+    except Exception as e:
+        parts.append(f"❌ **Erro ao ler arquivo:** {str(e)}\n")
     else:
-        result += "⚠️  **Status:** Arquivo não encontrado\n\n"
-        result += "💡 **Sugestão:** Crie o arquivo de configuração SSH:\n"
-        result += f"```bash\ntouch {config_file}\nchmod 600 {config_file}\n```\n"
+        parts.append("✅ **Status:** Arquivo encontrado\n\n")
+        if len(content) > _CONFIG_EMBED_LIMIT:
+            parts.append(f"📝 **Conteúdo do arquivo:**\n```\n{content[:_CONFIG_EMBED_LIMIT]}\n```\n")
+            parts.append(
+                f"✂️  *Conteúdo truncado: exibindo {_CONFIG_EMBED_LIMIT} de "
+                f"{len(content)} caracteres.*\n\n"
+            )
+        else:
+            parts.append(f"📝 **Conteúdo do arquivo:**\n```\n{content}\n```\n\n")
+        
+        # Análise básica (sobre o arquivo inteiro, mesmo se truncado acima)
+        hosts = _HOST_RE.findall(content)
+        
+        parts.append(f"🖥️  **Hosts configurados:** {len(hosts)}\n")
+        for host in hosts:
+            parts.append(f"   - {host}\n")
     
     # Verificar diretório .ssh
-    ssh_dir = os.path.expanduser("~/.ssh")
-    result += f"\n📂 **Diretório SSH:** {ssh_dir}\n"
+    parts.append(f"\n📂 **Diretório SSH:** {_HOME_SSH}\n")
     
-    if os.path.exists(ssh_dir):
-        files = os.listdir(ssh_dir)
-        result += f"📄 **Arquivos encontrados:** {len(files)}\n"
-        for file in sorted(files):
-            file_path = os.path.join(ssh_dir, file)
-            if os.path.isfile(file_path):
-                size = os.path.getsize(file_path)
-                result += f"   - {file} ({size} bytes)\n"
+    if dir_snapshot is not None:
+        total, files = dir_snapshot
+        parts.append(f"📄 **Arquivos encontrados:** {total}\n")
+        for name, size in files:
+            parts.append(f"   - {name} ({size} bytes)\n")
     else:
-        result += "❌ **Diretório ~/.ssh não existe**\n"
+        parts.append("❌ **Diretório ~/.ssh não existe**\n")
     
-    return [types.TextContent(type="text", text=result)]
+    return "".join(parts)
+
+def _config_report(config_file: str) -> str:
+    """
+    Coleta os metadados do arquivo e do diretório e consulta o cache.
+    """
+    expanded_path = os.path.expanduser(config_file)
+    try:
+        st = os.stat(expanded_path)
+        stamp = (st.st_mtime_ns, st.st_ctime_ns, st.st_size)
+    except OSError:
+        stamp = None
+    return _render_config_report(config_file, expanded_path, stamp, _scan_ssh_dir(_HOME_SSH))
+
+async def check_ssh_config(args: Dict[str, Any]) -> List[types.TextContent]:
+    """
+    Verifica configurações SSH do cliente.
+    """
+    config_file = args.get("config_file", "~/.ssh/config")
+    
+    # E/S de disco sem bloquear o loop de eventos do servidor MCP
+    text = await asyncio.to_thread(_config_report, config_file)
+    
+    return [types.TextContent(type="text", text=text)]
+
+# Dicas de resolução de problemas: não dependem dos argumentos
+_ANALYZE_TAIL = """\
+🛠️  **Resolução de problemas comuns:**
+
+1. **Timeout de conexão:**
+   - Verifique se o host está acessível na rede
+   - Confirme se a porta está correta
+   - Verifique firewalls
+
+2. **Autenticação falhada:**
+   - Verifique nome de usuário
+   - Confirme se a chave SSH está carregada
+   - Teste com password se configurado
+
+3. **Chave de host desconhecida:**
+   - Use `ssh-keyscan` para verificar a chave
+   - Adicione manualmente ao known_hosts se confiável
+
+"""
 
 async def analyze_ssh_connection(args: Dict[str, Any]) -> List[types.TextContent]:
     """
@@ -287,224 +387,293 @@ async def analyze_ssh_connection(args: Dict[str, Any]) -> List[types.TextContent
     port = args.get("port", 22)
     user = args["user"]
     
-    result = f"🔗 **Análise de Conexão SSH**\n\n"
-    result += f"🖥️  **Servidor:** {user}@{host}:{port}\n\n"
-    
     # Comando de conexão básico
-    ssh_cmd = f"ssh {user}@{host}"
-    if port != 22:
-        ssh_cmd += f" -p {port}"
-    
-    result += f"📝 **Comando de conexão:**\n```bash\n{ssh_cmd}\n```\n\n"
-    
-    # Comando de teste detalhado
-    verbose_cmd = f"{ssh_cmd} -v"
-    result += f"🔍 **Comando para diagnóstico (verbose):**\n```bash\n{verbose_cmd}\n```\n\n"
+    ssh_cmd = f"ssh {user}@{host}" if port == 22 else f"ssh {user}@{host} -p {port}"
     
-    # Teste de conectividade
-    nc_cmd = f"nc -zv {host} {port}"
-    result += f"🌐 **Teste de conectividade de rede:**\n```bash\n{nc_cmd}\n```\n\n"
-    
-    # Verificação de chave do servidor
-    keyscan_cmd = f"ssh-keyscan -p {port} {host}"
-    result += f"🔑 **Obter chave pública do servidor:**\n```bash\n{keyscan_cmd}\n```\n\n"
-    
-    # Dicas de resolução de problemas
-    result += "🛠️  **Resolução de problemas comuns:**\n\n"
-    result += "1. **Timeout de conexão:**\n"
-    result += "   - Verifique se o host está acessível na rede\n"
-    result += "   - Confirme se a porta está correta\n"
-    result += "   - Verifique firewalls\n\n"
-    
-    result += "2. **Autenticação falhada:**\n"
-    result += "   - Verifique nome de usuário\n"
-    result += "   - Confirme se a chave SSH está carregada\n"
-    result += "   - Teste com password se configurado\n\n"
-    
-    result += "3. **Chave de host desconhecida:**\n"
-    result += "   - Use `ssh-keyscan` para verificar a chave\n"
-    result += "   - Adicione manualmente ao known_hosts se confiável\n\n"
+    header = f"""🔗 **Análise de Conexão SSH**
+
+🖥️  **Servidor:** {user}@{host}:{port}
+
+📝 **Comando de conexão:**
+```bash
+{ssh_cmd}
+```
+
+🔍 **Comando para diagnóstico (verbose):**
+```bash
+{ssh_cmd} -v
+```
+
+🌐 **Teste de conectividade de rede:**
+```bash
+nc -zv {host} {port}
+```
+
+🔑 **Obter chave pública do servidor:**
+```bash
+ssh-keyscan -p {port} {host}
+```
+
+"""
     
-    return [types.TextContent(type="text", text=result)]
+    return [types.TextContent(type="text", text=header + _ANALYZE_TAIL)]
+
+# Relatórios de auditoria são estáticos: montados uma única vez na importação
+_AUDIT_HEADER = "🔒 **Auditoria de Segurança SSH - {}**\n\n"
+
+_AUDIT_CLIENT = """\
+👤 **Configuração do Cliente SSH**
+
+✅ **Verificações recomendadas:**
+
+1. **Algoritmos de chave seguros:**
+   - Use Ed25519 ou RSA ≥ 2048 bits
+   - Evite DSA e ECDSA com curvas fracas
+
+2. **Configuração ~/.ssh/config:**
+```
+Host *
+    Protocol 2
+    PubkeyAuthentication yes
+    PasswordAuthentication no
+    HostKeyAlgorithms ssh-ed25519,rsa-sha2-512,rsa-sha2-256
+    KexAlgorithms curve25519-sha256@libssh.org,diffie-hellman-group16-sha512
+    Ciphers chacha20-poly1305@openssh.com,aes256-gcm@openssh.com
+    MACs hmac-sha2-256-etm@openssh.com,hmac-sha2-512-etm@openssh.com
+```
+
+3. **Permissões de arquivos:**
+   - ~/.ssh/: 700
+   - ~/.ssh/config: 600
+   - Chaves privadas: 600
+   - Chaves públicas: 644
+
+"""
+
+_AUDIT_SERVER = """\
+🖥️  **Configuração do Servidor SSH**
+
+✅ **Configurações recomendadas (/etc/ssh/sshd_config):**
+
+```
+# Protocolo e porta
+Protocol 2
+Port 22  # Considere mudar para porta não-padrão
+
+# Autenticação
+PermitRootLogin no
+PubkeyAuthentication yes
+PasswordAuthentication no
+PermitEmptyPasswords no
+ChallengeResponseAuthentication no
+
+# Algoritmos seguros
+HostKeyAlgorithms ssh-ed25519,rsa-sha2-512,rsa-sha2-256
+KexAlgorithms curve25519-sha256@libssh.org,diffie-hellman-group16-sha512
+Ciphers chacha20-poly1305@openssh.com,aes256-gcm@openssh.com
+MACs hmac-sha2-256-etm@openssh.com,hmac-sha2-512-etm@openssh.com
+
+# Limites e timeouts
+MaxAuthTries 3
+MaxSessions 2
+ClientAliveInterval 300
+ClientAliveCountMax 2
+```
+
+"""
+
+_AUDIT_KEYS = """\
+🔑 **Auditoria de Chaves SSH**
+
+✅ **Verificações de segurança:**
+
+1. **Algoritmos recomendados (em ordem de preferência):**
+   - Ed25519 (mais seguro e rápido)
+   - RSA 4096 bits
+   - RSA 2048 bits (mínimo aceitável)
+
+2. **Algoritmos a evitar:**
+   - DSA (inseguro)
+   - RSA < 2048 bits
+   - ECDSA com curvas fracas
+
+3. **Boas práticas:**
+   - Use passphrase forte nas chaves privadas
+   - Rotacione chaves regularmente
+   - Uma chave por serviço/propósito
+   - Remova chaves públicas de contas inativas
+
+4. **Comandos de verificação:**
+```bash
+# Listar chaves carregadas no ssh-agent
+ssh-add -l
+
+# Verificar tipo e tamanho de chave
+ssh-keygen -l -f ~/.ssh/id_ed25519.pub
+
+# Verificar todas as chaves no diretório
+for key in ~/.ssh/*.pub; do echo "$key:"; ssh-keygen -l -f "$key"; done
+```
+
+"""
+
+_AUDIT_FOOTER = """\
+⚠️  **Alertas de segurança:**
+- Monitore logs de autenticação regularmente
+- Use fail2ban ou similar para proteção contra ataques
+- Considere autenticação de dois fatores
+- Mantenha o software SSH atualizado
+"""
+
+_AUDIT_TEXT: Dict[str, str] = {
+    target: _AUDIT_HEADER.format(target.upper()) + body + _AUDIT_FOOTER
+    for target, body in (
+        ("client", _AUDIT_CLIENT),
+        ("server", _AUDIT_SERVER),
+        ("keys", _AUDIT_KEYS),
+    )
+}
+
+# Respostas prontas: o mesmo TextContent é reaproveitado a cada chamada
+_AUDIT_CONTENT: Dict[str, List[types.TextContent]] = {
+    target: [types.TextContent(type="text", text=text)]
+    for target, text in _AUDIT_TEXT.items()
+}
 
 async def ssh_security_audit(args: Dict[str, Any]) -> List[types.TextContent]:
     """
     Realiza auditoria de segurança SSH.
     """
     target_type = args.get("target_type", "client")
-    
-    result = f"🔒 **Auditoria de Segurança SSH - {target_type.upper()}**\n\n"
-    
-    if target_type == "client":
-        result += "👤 **Configuração do Cliente SSH**\n\n"
-        
-        result += "✅ **Verificações recomendadas:**\n\n"
-        result += "1. **Algoritmos de chave seguros:**\n"
-        result += "   - Use Ed25519 ou RSA ≥ 2048 bits\n"
-        result += "   - Evite DSA e ECDSA com curvas fracas\n\n"
-        
-        result += "2. **Configuração ~/.ssh/config:**\n"
-        result += "```\n"
-        result += "Host *\n"
-        result += "    Protocol 2\n"
-        result += "    PubkeyAuthentication yes\n"
-        result += "    PasswordAuthentication no\n"
-        result += "    HostKeyAlgorithms ssh-ed25519,rsa-sha2-512,rsa-sha2-256\n"
-        result += "    KexAlgorithms curve25519-sha256@libssh.org,diffie-hellman-group16-sha512\n"
-        result += "    Ciphers chacha20-poly1305@openssh.com,aes256-gcm@openssh.com\n"
-        result += "    MACs hmac-sha2-256-etm@openssh.com,hmac-sha2-512-etm@openssh.com\n"
-        result += "```\n\n"
-        
-        result += "3. **Permissões de arquivos:**\n"
-        result += "   - ~/.ssh/: 700\n"
-        result += "   - ~/.ssh/config: 600\n"
-        result += "   - Chaves privadas: 600\n"
-        result += "   - Chaves públicas: 644\n\n"
-        
-    elif target_type == "server":
-        result += "🖥️  **Configuração do Servidor SSH**\n\n"
-        
-        result += "✅ **Configurações recomendadas (/etc/ssh/sshd_config):**\n\n"
-        result += "```\n"
-        result += "# Protocolo e porta\n"
-        result += "Protocol 2\n"
-        result += "Port 22  # Considere mudar para porta não-padrão\n\n"
-        
-        result += "# Autenticação\n"
-        result += "PermitRootLogin no\n"
-        result += "PubkeyAuthentication yes\n"
-        result += "PasswordAuthentication no\n"
-        result += "PermitEmptyPasswords no\n"
-        result += "ChallengeResponseAuthentication no\n\n"
-        
-        result += "# Algoritmos seguros\n"
-        result += "HostKeyAlgorithms ssh-ed25519,rsa-sha2-512,rsa-sha2-256\n"
-        result += "KexAlgorithms curve25519-sha256@libssh.org,diffie-hellman-group16-sha512\n"
-        result += "Ciphers chacha20-poly1305@openssh.com,aes256-gcm@openssh.com\n"
-        result += "MACs hmac-sha2-256-etm@openssh.com,hmac-sha2-512-etm@openssh.com\n\n"
-        
-        result += "# Limites e timeouts\n"
-        result += "MaxAuthTries 3\n"
-        result += "MaxSessions 2\n"
-        result += "ClientAliveInterval 300\n"
-        result += "ClientAliveCountMax 2\n"
-        result += "```\n\n"
-        
-    elif target_type == "keys":
-        result += "🔑 **Auditoria de Chaves SSH**\n\n"
-        
-        result += "✅ **Verificações de segurança:**\n\n"
-        result += "1. **Algoritmos recomendados (em ordem de preferência):**\n"
-        result += "   - Ed25519 (mais seguro e rápido)\n"
-        result += "   - RSA 4096 bits\n"
-        result += "   - RSA 2048 bits (mínimo aceitável)\n\n"
-        
-        result += "2. **Algoritmos a evitar:**\n"
-        result += "   - DSA (inseguro)\n"
-        result += "   - RSA < 2048 bits\n"
-        result += "   - ECDSA com curvas fracas\n\n"
-        
-        result += "3. **Boas práticas:**\n"
-        result += "   - Use passphrase forte nas chaves privadas\n"
-        result += "   - Rotacione chaves regularmente\n"
-        result += "   - Uma chave por serviço/propósito\n"
-        result += "   - Remova chaves públicas de contas inativas\n\n"
-        
-        result += "4. **Comandos de verificação:**\n"
-        result += "```bash\n"
-        result += "# Listar chaves carregadas no ssh-agent\n"
-        result += "ssh-add -l\n\n"
-        result += "# Verificar tipo e tamanho de chave\n"
-        result += "ssh-keygen -l -f ~/.ssh/id_ed25519.pub\n\n"
-        result += "# Verificar todas as chaves no diretório\n"
-        result += "for key in ~/.ssh/*.pub; do echo \"$key:\"; ssh-keygen -l -f \"$key\"; done\n"
-        result += "```\n\n"
-    
-    result += "⚠️  **Alertas de segurança:**\n"
-    result += "- Monitore logs de autenticação regularmente\n"
-    result += "- Use fail2ban ou similar para proteção contra ataques\n"
-    result += "- Considere autenticação de dois fatores\n"
-    result += "- Mantenha o software SSH atualizado\n"
-    
-    return [types.TextContent(type="text", text=result)]
+    content = _AUDIT_CONTENT.get(target_type)
+    if content is not None:
+        # Cópia rasa da lista; o TextContent em si é compartilhado
+        return list(content)
+    
+    # Tipo desconhecido: apenas cabeçalho e alertas, como antes
+    text = _AUDIT_HEADER.format(target_type.upper()) + _AUDIT_FOOTER
+    return [types.TextContent(type="text", text=text)]
+
+@dataclass(slots=True, frozen=True, kw_only=True)
+class TunnelArgs:
+    """
+    Argumentos de create_ssh_tunnel, validados uma única vez na entrada.
+    """
+    local_port: int
+    remote_host: str
+    remote_port: int
+    ssh_server: str
+    user: str
+    tunnel_type: str = "local"
+    
+    def __post_init__(self):
+        for name in ("local_port", "remote_port"):
+            port = getattr(self, name)
+            # bool é subclasse de int; True/False não são portas
+            if type(port) is not int or not 0 <= port <= 65535:
+                raise ValueError(f"{name} deve ser um inteiro entre 0 e 65535: {port!r}")
+
+# Campos aceitos por TunnelArgs; chaves extras enviadas pelo cliente são ignoradas
+_TUNNEL_FIELDS = tuple(f.name for f in fields(TunnelArgs))
+
+# Partes que variam por tipo de túnel: (opção de forwarding, título,
+# rota, passos 2-3 de uso, exemplos). Campos entre chaves são preenchidos
+# com os atributos de TunnelArgs via str.format(t=...).
+_TUNNEL_META: Dict[str, tuple] = {
+    "local": (
+        "-L {t.local_port}:{t.remote_host}:{t.remote_port}",
+        "Port Forwarding Local (Local → SSH Server → Remote Host)",
+        "🔗 **Conexão:** localhost:{t.local_port} → {t.ssh_server} → {t.remote_host}:{t.remote_port}",
+        "2. Conecte-se a localhost:{t.local_port}\n"
+        "3. O tráfego será redirecionado para {t.remote_host}:{t.remote_port}\n",
+        "- Acessar banco de dados remoto via SSH\n"
+        "- Conectar a serviços internos de uma rede\n"
+        "- Bypass de firewalls para acesso a aplicações\n",
+    ),
+    "remote": (
+        "-R {t.local_port}:{t.remote_host}:{t.remote_port}",
+        "Port Forwarding Remoto (SSH Server → Local → Remote Host)",
+        "🔗 **Conexão:** {t.ssh_server}:{t.local_port} → localhost → {t.remote_host}:{t.remote_port}",
+        "2. No servidor SSH, conecte-se a localhost:{t.local_port}\n"
+        "3. O tráfego será redirecionado para {t.remote_host}:{t.remote_port}\n",
+        "- Expor serviço local para servidor remoto\n"
+        "- Permitir acesso reverso a aplicações\n"
+        "- Compartilhar serviços de desenvolvimento\n",
+    ),
+    "dynamic": (
+        "-D {t.local_port}",
+        "Port Forwarding Dinâmico (Proxy SOCKS)",
+        "🔗 **Proxy SOCKS:** localhost:{t.local_port} → {t.ssh_server} → qualquer destino",
+        "2. Configure aplicações para usar proxy SOCKS localhost:{t.local_port}\n"
+        "3. Todo tráfego passará pelo servidor SSH\n",
+        "- Navegar web através do servidor SSH\n"
+        "- Mascarar IP de origem\n"
+        "- Acessar recursos geograficamente restritos\n",
+    ),
+}
 
 async def create_ssh_tunnel(args: Dict[str, Any]) -> List[types.TextContent]:
     """
     Cria comandos para túneis SSH.
     """
-    tunnel_type = args["tunnel_type"]
-    local_port = args["local_port"]
-    remote_host = args["remote_host"]
-    remote_port = args["remote_port"]
-    ssh_server = args["ssh_server"]
-    user = args["user"]
-    
-    result = f"🚇 **Configuração de Túnel SSH - {tunnel_type.upper()}**\n\n"
-    
-    if tunnel_type == "local":
-        cmd = f"ssh -L {local_port}:{remote_host}:{remote_port} {user}@{ssh_server}"
-        result += "📍 **Port Forwarding Local (Local → SSH Server → Remote Host)**\n\n"
-        result += f"🔗 **Conexão:** localhost:{local_port} → {ssh_server} → {remote_host}:{remote_port}\n\n"
-        
-    elif tunnel_type == "remote":
-        cmd = f"ssh -R {local_port}:{remote_host}:{remote_port} {user}@{ssh_server}"
-        result += "📍 **Port Forwarding Remoto (SSH Server → Local → Remote Host)**\n\n"
-        result += f"🔗 **Conexão:** {ssh_server}:{local_port} → localhost → {remote_host}:{remote_port}\n\n"
-        
-    elif tunnel_type == "dynamic":
-        cmd = f"ssh -D {local_port} {user}@{ssh_server}"
-        result += "📍 **Port Forwarding Dinâmico (Proxy SOCKS)**\n\n"
-        result += f"🔗 **Proxy SOCKS:** localhost:{local_port} → {ssh_server} → qualquer destino\n\n"
-    
-    result += f"📝 **Comando:**\n```bash\n{cmd}\n```\n\n"
+    t = TunnelArgs(**{name: args[name] for name in _TUNNEL_FIELDS if name in args})
+    meta = _TUNNEL_META.get(t.tunnel_type)
+    if meta is None:
+        raise ValueError(f"Tipo de túnel desconhecido: {t.tunnel_type}")
     
-    # Comandos adicionais úteis
-    result += "🛠️  **Opções úteis:**\n\n"
-    result += f"**Manter túnel em background:**\n```bash\n{cmd} -N -f\n```\n\n"
-    result += f"**Com verbose para debug:**\n```bash\n{cmd} -v\n```\n\n"
-    result += f"**Especificar arquivo de chave:**\n```bash\n{cmd} -i ~/.ssh/id_ed25519\n```\n\n"
+    forward, title, route, usage, examples = (part.format(t=t) for part in meta)
+    cmd = f"ssh {forward} {t.user}@{t.ssh_server}"
     
-    # Instruções de uso
-    if tunnel_type == "local":
-        result += "📋 **Como usar:**\n"
-        result += f"1. Execute o comando acima\n"
-        result += f"2. Conecte-se a localhost:{local_port}\n"
-        result += f"3. O tráfego será redirecionado para {remote_host}:{remote_port}\n\n"
-        
-        result += "💡 **Exemplo de uso:**\n"
-        result += "- Acessar banco de dados remoto via SSH\n"
-        result += "- Conectar a serviços internos de uma rede\n"
-        result += "- Bypass de firewalls para acesso a aplicações\n\n"
-        
-    elif tunnel_type == "remote":
-        result += "📋 **Como usar:**\n"
-        result += f"1. Execute o comando acima\n"
-        result += f"2. No servidor SSH, conecte-se a localhost:{local_port}\n"
-        result += f"3. O tráfego será redirecionado para {remote_host}:{remote_port}\n\n"
-        
-        result += "💡 **Exemplo de uso:**\n"
-        result += "- Expor serviço local para servidor remoto\n"
-        result += "- Permitir acesso reverso a aplicações\n"
-        result += "- Compartilhar serviços de desenvolvimento\n\n"
-        
-    elif tunnel_type == "dynamic":
-        result += "📋 **Como usar:**\n"
-        result += f"1. Execute o comando acima\n"
-        result += f"2. Configure aplicações para usar proxy SOCKS localhost:{local_port}\n"
-        result += f"3. Todo tráfego passará pelo servidor SSH\n\n"
-        
-        result += "💡 **Exemplo de uso:**\n"
-        result += "- Navegar web através do servidor SSH\n"
-        result += "- Mascarar IP de origem\n"
-        result += "- Acessar recursos geograficamente restritos\n\n"
-    
-    result += "⚠️  **Considerações de segurança:**\n"
-    result += "- Túneis SSH consomem recursos do servidor\n"
-    result += "- Monitore conexões ativas regularmente\n"
-    result += "- Use apenas em redes confiáveis\n"
-    result += "- Considere VPN para uso permanente\n"
+    text = f"""🚇 **Configuração de Túnel SSH - {t.tunnel_type.upper()}**
+
+📍 **{title}**
+
+{route}
+
+📝 **Comando:**
+```bash
+{cmd}
+```
+
+🛠️  **Opções úteis:**
+
+**Manter túnel em background:**
+```bash
+{cmd} -N -f
+```
+
+**Com verbose para debug:**
+```bash
+{cmd} -v
+```
+
+**Especificar arquivo de chave:**
+```bash
+{cmd} -i ~/.ssh/id_ed25519
+```
+
+📋 **Como usar:**
+1. Execute o comando acima
+{usage}
+💡 **Exemplo de uso:**
+{examples}
+⚠️  **Considerações de segurança:**
+- Túneis SSH consomem recursos do servidor
+- Monitore conexões ativas regularmente
+- Use apenas em redes confiáveis
+- Considere VPN para uso permanente
+"""
     
-    return [types.TextContent(type="text", text=result)]
+    return [types.TextContent(type="text", text=text)]
+
+# Tabela de despacho usada por handle_call_tool
+_HANDLERS = {
+    "generate_ssh_key": generate_ssh_key,
+    "check_ssh_config": check_ssh_config,
+    "analyze_ssh_connection": analyze_ssh_connection,
+    "ssh_security_audit": ssh_security_audit,
+    "create_ssh_tunnel": create_ssh_tunnel,
+}
 
 async def main():
     """
@@ -526,4 +695,11 @@ async def main():
         )
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    logging.basicConfig(level=logging.INFO)
+    # uvloop (libuv) é opcional: acelera o loop de eventos onde disponível
+    try:
+        from uvloop import run
+    except ImportError:
+        # uvloop ausente ou anterior à 0.18 (sem uvloop.run)
+        run = asyncio.run
+    run(main())
\ No newline at end of file